@@ -1,131 +1,345 @@
 import pandas as pd
-from typing import Dict, List, Tuple, Callable
+from typing import Dict, List, Tuple, Callable, Union
 import numpy as np
-from translator import TranslationService
+from numpy.lib.stride_tricks import sliding_window_view
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from translator import TranslationService, TRANSLATION_EXECUTOR, MAX_QUEUED_BATCHES
+from translation_cache import TranslationCache
+from postinstall import ensure_nltk_data
 from nltk.translate.meteor_score import meteor_score
-from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
+from sacrebleu.metrics import BLEU
 import nltk
+import math
 import warnings
+from functools import lru_cache
+from collections import Counter, defaultdict
 
-# Download required NLTK data
+# Download required NLTK data if it was not installed by postinstall.py
 try:
-    nltk.download('wordnet', quiet=True)
-    nltk.download('punkt', quiet=True)
+    ensure_nltk_data()
 except Exception as e:
     warnings.warn(f"Failed to download NLTK data: {str(e)}")
 
+@lru_cache(maxsize=200_000)
+def _tok(text: str) -> Tuple[str, ...]:
+    """Lowercase and word-tokenize text, memoized since references and candidates repeat."""
+    return tuple(nltk.word_tokenize(text.lower()))
+
+def _sentence_ngrams(sentences: List[np.ndarray], n: int) -> np.ndarray:
+    """Stack the n-grams of every encoded sentence as rows of (sentence index, id_1, ..., id_n)."""
+    blocks = [np.column_stack((np.full(len(ids) - n + 1, i, dtype=np.int32), sliding_window_view(ids, n)))
+              for i, ids in enumerate(sentences) if len(ids) >= n]
+    return np.concatenate(blocks) if blocks else np.empty((0, n + 1), dtype=np.int32)
+
+def _bleu_statistics(references: List[str], candidates: List[str],
+                     max_order: int = 4) -> Tuple[List[int], List[int], int, int]:
+    """
+    Compute corpus BLEU sufficient statistics (correct, total, sys_len, ref_len) with NumPy.
+    
+    Tokens are mapped to int32 vocabulary IDs once, then for each n-gram order all sentences
+    are counted in a single np.unique pass. The sentence index is kept as an extra column so
+    that matches are still clipped per sentence.
+    """
+    vocab = {}
+    
+    def encode(tokens: Tuple[str, ...]) -> np.ndarray:
+        return np.fromiter((vocab.setdefault(token, len(vocab)) for token in tokens),
+                           dtype=np.int32, count=len(tokens))
+    
+    reference_ids = [encode(_tok(reference)) for reference in references]
+    candidate_ids = [encode(_tok(candidate)) for candidate in candidates]
+    
+    correct, total = [], []
+    for n in range(1, max_order + 1):
+        candidate_ngrams = _sentence_ngrams(candidate_ids, n)
+        reference_ngrams = _sentence_ngrams(reference_ids, n)
+        total.append(len(candidate_ngrams))
+        if len(candidate_ngrams) == 0 or len(reference_ngrams) == 0:
+            correct.append(0)
+            continue
+        
+        _, inverse = np.unique(np.concatenate([candidate_ngrams, reference_ngrams]),
+                               axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        n_unique = inverse.max() + 1
+        candidate_counts = np.bincount(inverse[:len(candidate_ngrams)], minlength=n_unique)
+        reference_counts = np.bincount(inverse[len(candidate_ngrams):], minlength=n_unique)
+        correct.append(int(np.minimum(candidate_counts, reference_counts).sum()))
+    
+    sys_len = sum(len(ids) for ids in candidate_ids)
+    ref_len = sum(len(ids) for ids in reference_ids)
+    return correct, total, sys_len, ref_len
+
+# Corpus BLEU over inputs already tokenized by _tok. This is sacrebleu's floor-smoothed BLEU, not
+# NLTK's corpus_bleu: orders without matches count 0.1 matches, but a corpus too short to have any
+# n-grams of some order scores 0.
+_BLEU = BLEU(tokenize='none', smooth_method='floor', smooth_value=0.1)
+
+# Sentence BLEU follows NLTK's sentence_bleu with SmoothingFunction().method1, the scores this
+# project reported previously: orders without matches count BLEU_EPSILON matches instead
+BLEU_MAX_ORDER = 4
+BLEU_EPSILON = 0.1
+
+# The metric functions below live at module level so ProcessPoolExecutor workers can unpickle them
+
+def _meteor(reference_tokens: Tuple[str, ...], candidate_tokens: Tuple[str, ...]) -> float:
+    """Calculate METEOR score from texts already tokenized by _tok."""
+    try:
+        return meteor_score([reference_tokens], candidate_tokens)
+    except Exception as e:
+        print(f"Error calculating METEOR score: {str(e)}")
+        return 0.0
+
+def _bleu(reference_tokens: Tuple[str, ...], candidate_tokens: Tuple[str, ...]) -> float:
+    """Calculate BLEU score from texts already tokenized by _tok."""
+    try:
+        if not candidate_tokens:
+            return 0.0
+        
+        log_precision = 0.0
+        for n in range(1, BLEU_MAX_ORDER + 1):
+            candidate_ngrams = Counter(zip(*(candidate_tokens[i:] for i in range(n))))
+            reference_ngrams = Counter(zip(*(reference_tokens[i:] for i in range(n))))
+            matches = sum((candidate_ngrams & reference_ngrams).values())
+            if n == 1 and matches == 0:
+                return 0.0
+            # Like NLTK, an order longer than the candidate still counts as one n-gram
+            total = max(1, len(candidate_tokens) - n + 1)
+            log_precision += math.log((matches or BLEU_EPSILON) / total) / BLEU_MAX_ORDER
+        
+        candidate_len, reference_len = len(candidate_tokens), len(reference_tokens)
+        brevity_penalty = 1.0 if candidate_len > reference_len else math.exp(1 - reference_len / candidate_len)
+        return brevity_penalty * math.exp(log_precision)
+    except Exception as e:
+        print(f"Error calculating BLEU score: {str(e)}")
+        return 0.0
+
+def _score_meteor(reference: str, candidate: str) -> float:
+    """Calculate METEOR score for a translation."""
+    return _meteor(_tok(reference), _tok(candidate))
+
+def _score_bleu(reference: str, candidate: str) -> float:
+    """Calculate BLEU score for a translation."""
+    return _bleu(_tok(reference), _tok(candidate))
+
+def _score_triples(triples: List[Tuple[str, str, str]]) -> List[Tuple[float, float, float, float]]:
+    """Score (reference, llm_translation, google_translation) triples in METRIC_NAMES order."""
+    scores = []
+    for reference, llm_translation, google_translation in triples:
+        # Normalize each text once and share the tokens between both metrics
+        reference_tokens = _tok(reference)
+        llm_tokens = _tok(llm_translation)
+        google_tokens = _tok(google_translation)
+        scores.append((_meteor(reference_tokens, llm_tokens), _meteor(reference_tokens, google_tokens),
+                       _bleu(reference_tokens, llm_tokens), _bleu(reference_tokens, google_tokens)))
+    return scores
+
+# Column order of the scores returned by _score_triples
+METRIC_NAMES = ('llm_meteor', 'google_meteor', 'llm_bleu', 'google_bleu')
+
 class TranslationEvaluator:
-    def __init__(self):
-        self.translator = TranslationService()
-        self.smoothing = SmoothingFunction().method1
+    def __init__(self, translator: TranslationService = None):
+        # Route translations through the on-disk cache so re-runs only recompute metrics
+        self.translator = TranslationCache(translator or TranslationService())
+        self.bleu = _BLEU
 
     def load_dataset(self, file_path: str) -> pd.DataFrame:
         """Load the evaluation dataset."""
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
+        # Only the source and reference columns are used downstream
+        df = pd.read_csv(file_path, encoding='utf-8-sig', dtype='string',
+                         usecols=lambda column: column in {'english', 'translated_value', 'label'})
         if 'translated_value' in df.columns:
             df = df.rename(columns={'translated_value': 'label'})
         return df
 
     def calculate_meteor_score(self, reference: str, candidate: str) -> float:
         """Calculate METEOR score for a translation."""
-        try:
-            # Tokenize the strings
-            reference_tokens = nltk.word_tokenize(reference.lower())
-            candidate_tokens = nltk.word_tokenize(candidate.lower())
-            return meteor_score([reference_tokens], candidate_tokens)
-        except Exception as e:
-            print(f"Error calculating METEOR score: {str(e)}")
-            return 0.0
+        return _score_meteor(reference, candidate)
 
     def calculate_bleu_score(self, reference: str, candidate: str) -> float:
         """Calculate BLEU score for a translation."""
+        return _score_bleu(reference, candidate)
+
+    def calculate_corpus_bleu_score(self, references: List[str], candidates: List[str]) -> float:
+        """
+        Calculate corpus-level BLEU score over aligned references and candidates.
+        
+        Uses sacrebleu's floor smoothing (see _BLEU), so it is not comparable with NLTK's
+        corpus_bleu or with the averaged sentence BLEU scores.
+        """
+        if not candidates:
+            return 0.0
         try:
-            # Tokenize the strings
-            reference_tokens = [nltk.word_tokenize(reference.lower())]
-            candidate_tokens = nltk.word_tokenize(candidate.lower())
-            return sentence_bleu(reference_tokens, candidate_tokens, smoothing_function=self.smoothing)
+            correct, total, sys_len, ref_len = _bleu_statistics(references, candidates)
+            return self.bleu.compute_bleu(correct, total, sys_len, ref_len,
+                                          smooth_method=self.bleu.smooth_method,
+                                          smooth_value=self.bleu.smooth_value).score / 100
         except Exception as e:
-            print(f"Error calculating BLEU score: {str(e)}")
+            print(f"Error calculating corpus BLEU score: {str(e)}")
             return 0.0
 
     def evaluate_translation(self, reference_text: str, llm_translation: str, 
                            google_translation: str) -> Dict[str, float]:
         """Evaluate translations using METEOR and BLEU scores."""
-        # Calculate METEOR scores
-        llm_meteor = self.calculate_meteor_score(reference_text, llm_translation)
-        google_meteor = self.calculate_meteor_score(reference_text, google_translation)
-        
-        # Calculate BLEU scores
-        llm_bleu = self.calculate_bleu_score(reference_text, llm_translation)
-        google_bleu = self.calculate_bleu_score(reference_text, google_translation)
-        
-        return {
-            'llm_meteor': llm_meteor,
-            'google_meteor': google_meteor,
-            'llm_bleu': llm_bleu,
-            'google_bleu': google_bleu
-        }
+        [scores] = _score_triples([(reference_text, llm_translation, google_translation)])
+        return dict(zip(METRIC_NAMES, scores))
 
-    def evaluate_dataset(self, dataset_path: str, target_language: str = 'Hungarian', 
-                        progress_callback: Callable[[int, int, Dict], None] = None) -> Dict[str, float]:
+    def evaluate_dataset(self, dataset_path: Union[str, pd.DataFrame], target_language: str = 'Hungarian', 
+                        progress_callback: Callable[[int, int, Dict], None] = None,
+                        batch_size: int = 64,
+                        metric_workers: int = 1) -> Dict[str, float]:
         """
         Evaluate the entire dataset using both translation methods and multiple metrics.
         
         Args:
-            dataset_path: Path to the dataset CSV file
+            dataset_path: Path to the dataset CSV file, or a dataset already returned by load_dataset
             target_language: Target language for translation
             progress_callback: Callback function for progress updates
                              Args: current_row, total_rows, latest_metrics
+            batch_size: Number of texts sent to a provider in one translation request
+            metric_workers: Number of processes used to compute METEOR/BLEU. With 1 the metrics
+                            are computed in this process; more only pays off on large datasets
+                            since each worker has to load WordNet.
         """
-        df = self.load_dataset(dataset_path)
-        metrics_list = []
+        if isinstance(dataset_path, pd.DataFrame):
+            df = dataset_path
+        else:
+            df = self.load_dataset(dataset_path)
         
         total_rows = len(df)
+        # Running sums of the scores (in METRIC_NAMES order) and of their squares,
+        # so averages and standard deviations are O(1) to update per row
+        sums = np.zeros(len(METRIC_NAMES))
+        sq_sums = np.zeros(len(METRIC_NAMES))
+        n_scored = 0
+        completed = 0
+        # Texts of the scored rows, kept for the corpus-level BLEU pass
+        references, llm_translations, google_translations = [], [], []
+        
+        english_col = df['english'].fillna('').to_numpy()
+        label_col = df['label'].fillna('').to_numpy()
         
-        for idx, row in df.iterrows():
-            try:
-                original_text = row['english']
-                reference_text = row['label']
-                
-                # Get translations
-                llm_translation = self.translator.translate_with_llm(original_text, target_language)
-                google_translation = self.translator.translate_with_google(original_text, target_language)
-                
-                if llm_translation and google_translation:
-                    metrics = self.evaluate_translation(reference_text, llm_translation, google_translation)
-                    metrics_list.append(metrics)
+        # Translate each distinct source text once; rows sharing a text share its translations.
+        # Rows without source text are left unscored instead of being sent to the providers.
+        rows_of = defaultdict(list)
+        for idx, text in enumerate(english_col):
+            if text.strip():
+                rows_of[text].append(idx)
+            else:
+                completed += 1
+        unique_texts = list(rows_of)
+        batch_starts = range(0, len(unique_texts), batch_size)
+        
+        # METEOR/BLEU are CPU-bound and hold the GIL, so they optionally run in worker processes
+        metric_pool = ProcessPoolExecutor(max_workers=metric_workers) if metric_workers > 1 else None
+        
+        # Translation is network-bound, so send batches of rows to the shared thread pool. Each finished
+        # batch is scored (inline or in the process pool) and folded into the running metrics.
+        # Only MAX_QUEUED_BATCHES batches are queued at a time, so other jobs sharing the pool are
+        # not stuck behind this whole dataset.
+        next_starts = iter(batch_starts)
+        batch_of = {}  # LLM future -> (batch texts, Google future)
+        scoring = {}
+        pending = set()
+        
+        def submit_next_batch() -> None:
+            start = next(next_starts, None)
+            if start is None:
+                return
+            # Queue both providers' requests for a batch together, so batches finish roughly in
+            # order instead of every Google batch waiting behind all of the LLM ones
+            batch_texts = unique_texts[start:start + batch_size]
+            llm_fut = TRANSLATION_EXECUTOR.submit(self.translator.translate_with_llm_batch,
+                                                  batch_texts, target_language)
+            goog_fut = TRANSLATION_EXECUTOR.submit(self.translator.translate_with_google_batch,
+                                                   batch_texts, target_language)
+            batch_of[llm_fut] = (batch_texts, goog_fut)
+            pending.add(llm_fut)
+        
+        try:
+            for _ in range(MAX_QUEUED_BATCHES):
+                submit_next_batch()
+            
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                pending.difference_update(done)
+                for fut in done:
+                    if fut in scoring:
+                        # A batch scored in the process pool
+                        triples = scoring.pop(fut)
+                        try:
+                            batch_scores = fut.result()
+                        except Exception as e:
+                            print(f"Error scoring {len(triples)} rows: {str(e)}")
+                            completed += len(triples)
+                            continue
+                    else:
+                        # A translated batch; keep the rows both methods could translate
+                        batch_texts, goog_fut = batch_of.pop(fut)
+                        submit_next_batch()
+                        try:
+                            batch_translations = zip(batch_texts, fut.result(), goog_fut.result())
+                        except Exception as e:
+                            print(f"Error translating {len(batch_texts)} texts: {str(e)}")
+                            completed += sum(len(rows_of[text]) for text in batch_texts)
+                            continue
+                        
+                        triples = []
+                        for text, llm_translation, google_translation in batch_translations:
+                            if llm_translation and google_translation:
+                                triples.extend((label_col[idx], llm_translation, google_translation)
+                                               for idx in rows_of[text])
+                            else:
+                                completed += len(rows_of[text])
+                        
+                        if metric_pool:
+                            score_fut = metric_pool.submit(_score_triples, triples)
+                            scoring[score_fut] = triples
+                            pending.add(score_fut)
+                            continue
+                        batch_scores = _score_triples(triples)
                     
-                    # Calculate running averages for progress updates
-                    if progress_callback and metrics_list:
-                        current_metrics = {
-                            'llm_meteor': np.mean([m['llm_meteor'] for m in metrics_list]),
-                            'google_meteor': np.mean([m['google_meteor'] for m in metrics_list]),
-                            'llm_bleu': np.mean([m['llm_bleu'] for m in metrics_list]),
-                            'google_bleu': np.mean([m['google_bleu'] for m in metrics_list])
-                        }
-                        progress_callback(idx + 1, total_rows, current_metrics)
-                
-            except Exception as e:
-                print(f"Error processing row {idx}: {str(e)}")
-                continue
+                    for (reference_text, llm_translation, google_translation), vec in zip(triples, batch_scores):
+                        vec = np.asarray(vec)
+                        sums += vec
+                        sq_sums += vec * vec
+                        n_scored += 1
+                        completed += 1
+                        references.append(reference_text)
+                        llm_translations.append(llm_translation)
+                        google_translations.append(google_translation)
+                        
+                        # Calculate running averages for progress updates
+                        if progress_callback:
+                            current_metrics = dict(zip(METRIC_NAMES, sums / n_scored))
+                            progress_callback(completed, total_rows, current_metrics)
+        finally:
+            # On an early exit (e.g. an error, or Streamlit stopping the script) drop the queued
+            # requests instead of letting the shared pool send them and discard the results
+            for llm_fut, (_, goog_fut) in batch_of.items():
+                llm_fut.cancel()
+                goog_fut.cancel()
+            if metric_pool:
+                metric_pool.shutdown(cancel_futures=True)
         
         # Calculate final metrics
-        avg_metrics = {
-            'llm_meteor': np.mean([m['llm_meteor'] for m in metrics_list]),
-            'google_meteor': np.mean([m['google_meteor'] for m in metrics_list]),
-            'llm_bleu': np.mean([m['llm_bleu'] for m in metrics_list]),
-            'google_bleu': np.mean([m['google_bleu'] for m in metrics_list])
-        }
+        if n_scored == 0:
+            raise ValueError("No rows could be translated by both methods, so there is nothing to score")
+        
+        means = sums / n_scored
+        avg_metrics = dict(zip(METRIC_NAMES, means))
+        
+        # Calculate standard deviations, clipping tiny negative variances from float cancellation
+        stds = np.sqrt(np.maximum(sq_sums / n_scored - means ** 2, 0.0))
+        std_metrics = {f'{name}_std': std for name, std in zip(METRIC_NAMES, stds)}
         
-        # Calculate standard deviations
-        std_metrics = {
-            'llm_meteor_std': np.std([m['llm_meteor'] for m in metrics_list]),
-            'google_meteor_std': np.std([m['google_meteor'] for m in metrics_list]),
-            'llm_bleu_std': np.std([m['llm_bleu'] for m in metrics_list]),
-            'google_bleu_std': np.std([m['google_bleu'] for m in metrics_list])
+        # Corpus BLEU pools n-gram counts over all rows in a single pass
+        corpus_metrics = {
+            'llm_corpus_bleu': self.calculate_corpus_bleu_score(references, llm_translations),
+            'google_corpus_bleu': self.calculate_corpus_bleu_score(references, google_translations)
         }
         
         # Combine metrics
-        all_metrics = {**avg_metrics, **std_metrics}
+        all_metrics = {**avg_metrics, **std_metrics, **corpus_metrics}
         
         return all_metrics 
\ No newline at end of file
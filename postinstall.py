@@ -0,0 +1,27 @@
+"""
+One-time setup of the NLTK data used by the evaluation metrics.
+
+Run this during deployment (the Dockerfile does) so that importing the application
+only has to confirm the resources are present instead of contacting the NLTK server.
+"""
+import nltk
+
+# (download id, path passed to nltk.data.find)
+NLTK_RESOURCES = [
+    ('wordnet', 'corpora/wordnet'),
+    ('punkt', 'tokenizers/punkt'),
+    ('punkt_tab', 'tokenizers/punkt_tab'),
+]
+
+
+def ensure_nltk_data() -> None:
+    """Download the NLTK resources that are not already installed."""
+    for resource, path in NLTK_RESOURCES:
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            nltk.download(resource, quiet=True)
+
+
+if __name__ == '__main__':
+    ensure_nltk_data()
@@ -0,0 +1,66 @@
+"""Client-side request pacing and retries for the translation backends."""
+import asyncio
+import random
+import threading
+import time
+from typing import Callable, Tuple, Type, TypeVar
+
+T = TypeVar('T')
+
+
+class TransientError(Exception):
+    """A failure worth retrying, such as a rate-limit or 5xx response from a provider."""
+
+
+class RateLimiter:
+    """
+    Token bucket that lets through at most `rate` calls per `period` seconds.
+
+    Up to `burst` calls may go through back to back; after that callers are spaced out evenly.
+    Each call reserves a token up front, so concurrent callers queue in arrival order instead of
+    all waking up at the same moment.
+    """
+
+    def __init__(self, rate: float, period: float = 60.0, burst: int = 1):
+        self.interval = period / rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take one token and return how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) / self.interval)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens * self.interval)
+
+    def wait(self) -> None:
+        """Block until the next call is allowed."""
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def wait_async(self) -> None:
+        """Wait until the next call is allowed without blocking the event loop."""
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Exponential backoff with full jitter: a random delay up to base * 2**attempt, capped."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def retry_with_backoff(func: Callable[[], T], retry_on: Tuple[Type[BaseException], ...],
+                       max_tries: int = 5) -> T:
+    """Call func, retrying with backoff_delay between attempts while it raises one of retry_on."""
+    for attempt in range(max_tries - 1):
+        try:
+            return func()
+        except retry_on:
+            time.sleep(backoff_delay(attempt))
+    return func()
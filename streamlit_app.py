@@ -1,6 +1,7 @@
 import streamlit as st
-from translator import TranslationService
+from translator import TranslationService, TRANSLATION_EXECUTOR, MAX_QUEUED_BATCHES
 from evaluator import TranslationEvaluator
+from postinstall import ensure_nltk_data
 import pandas as pd
 import altair as alt
 import io
@@ -8,6 +9,8 @@ import csv
 from typing import Dict
 import nltk
 import os
+import gc
+from collections import deque
 
 st.set_page_config(
     page_title="Broker Translation",
@@ -15,18 +18,28 @@ st.set_page_config(
     layout="wide"
 )
 
-# Initialize services
-translator = TranslationService()
-evaluator = TranslationEvaluator()
+# Services are created once per server process and shared across reruns and sessions
+@st.cache_resource
+def get_translator() -> TranslationService:
+    return TranslationService()
+
+@st.cache_resource
+def get_evaluator() -> TranslationEvaluator:
+    return TranslationEvaluator(get_translator())
+
+@st.cache_data(show_spinner=False)
+def load_evaluation_dataset(path: str, mtime: float) -> pd.DataFrame:
+    # mtime is part of the cache key so edits to the file invalidate the cached frame
+    return get_evaluator().load_dataset(path)
+
+translator = get_translator()
 
 # Ensure NLTK data is available
 @st.cache_resource
 def setup_nltk():
     try:
-        # Try to download required NLTK data
-        nltk.download('wordnet', quiet=True)
-        nltk.download('punkt', quiet=True)
-        nltk.download('punkt_tab', quiet=True)
+        # Download any required NLTK data that is not installed yet
+        ensure_nltk_data()
     except Exception as e:
         st.error(f"Error downloading NLTK data: {str(e)}")
         st.info("Please ensure NLTK data is properly installed in the Docker container.")
@@ -63,6 +76,9 @@ st.markdown("""
 # Sidebar for navigation
 page = st.sidebar.radio("Navigation", ["Translator", "Batch Processing", "Evaluation"])
 
+# Debug aid for tracking memory regressions on large uploads
+show_memory_usage = st.sidebar.checkbox("Show memory usage", value=False)
+
 if page == "Translator":
     # Main translation interface
     st.header("Translation Interface")
@@ -114,14 +130,15 @@ elif page == "Batch Processing":
     # Translation method selection
     translation_method = st.radio(
         "Select translation method",
-        ["LLM (GPT-4)", "Google Translate"],
+        ["LLM (GPT-4o mini)", "Google Translate"],
         horizontal=True
     )
     
     if uploaded_file is not None:
         try:
-            # Read the CSV file with UTF-8 encoding
-            df = pd.read_csv(uploaded_file, encoding='utf-8-sig')
+            # Read the CSV file with UTF-8 encoding; the pandas string dtype keeps the
+            # source column compact and makes missing values explicit
+            df = pd.read_csv(uploaded_file, encoding='utf-8-sig', dtype={'english': 'string'})
             
             # Validate the CSV structure
             if 'english' not in df.columns:
@@ -130,45 +147,78 @@ elif page == "Batch Processing":
                 st.write("Preview of the input data:")
                 st.dataframe(df.head())
                 
+                if show_memory_usage:
+                    st.caption(f"Uploaded data uses {df.memory_usage(deep=True).sum() / 1e6:.2f} MB in memory")
+                
                 if st.button("Start Batch Translation", type="primary"):
                     progress_bar = st.progress(0)
                     status_text = st.empty()
                     error_log = []
                     
-                    # Create a new column for translations
-                    df['translated_value'] = None
                     total_rows = len(df)
+                    texts = df['english'].fillna('').str.strip().tolist()
+                    preview = df.head()
+                    preview_translations = []
                     
-                    # Perform translations
-                    for idx, row in df.iterrows():
-                        try:
-                            status_text.text(f"Translating row {idx + 1} of {total_rows}...")
-                            
-                            # Ensure the input text is properly encoded
-                            input_text = str(row['english']).strip()
+                    # Stream rows into the output CSV as they are translated, keeping every uploaded
+                    # column and adding (or replacing) translated_value
+                    output = io.StringIO()
+                    df.head(0).assign(translated_value=[]).to_csv(output, index=False, quoting=csv.QUOTE_ALL)
+                    
+                    method = 'llm' if translation_method == "LLM (GPT-4o mini)" else 'google'
+                    
+                    # Send rows to the provider in batches, several batches at a time, and drain
+                    # the batches in order so each row can be written out as soon as it is ready.
+                    # Repeated texts within a batch are translated once.
+                    # The thread pool is shared with other sessions, so only MAX_QUEUED_BATCHES
+                    # batches are queued at a time. Blank rows are never sent to the provider and
+                    # get an empty translated_value.
+                    batch_size = 64
+                    batch_starts = iter(range(0, total_rows, batch_size))
+                    queued = deque()
+                    
+                    def queue_next_batch():
+                        start = next(batch_starts, None)
+                        if start is not None:
+                            filled = [i for i, text in enumerate(texts[start:start + batch_size], start=start) if text]
+                            queued.append((start, filled, TRANSLATION_EXECUTOR.submit(
+                                translator.translate_many, [texts[i] for i in filled], target_lang, method)))
+                    
+                    try:
+                        for _ in range(MAX_QUEUED_BATCHES):
+                            queue_next_batch()
+                        
+                        while queued:
+                            start, filled, future = queued.popleft()
+                            queue_next_batch()
+                            batch_texts = texts[start:start + batch_size]
+                            try:
+                                filled_translations = future.result()
+                            except Exception as e:
+                                error_log.append(f"Rows {start + 1}-{start + len(batch_texts)}: {str(e)}")
+                                filled_translations = ["ERROR"] * len(filled)
                             
-                            if translation_method == "LLM (GPT-4)":
-                                translation = translator.translate_with_llm(input_text, target_lang)
-                            else:
-                                translation = translator.translate_with_google(input_text, target_lang)
+                            error_log.extend(f"Row {idx + 1}: Translation failed"
+                                             for idx, translation in zip(filled, filled_translations)
+                                             if not translation)
+                            batch_translations = [""] * len(batch_texts)
+                            for idx, translation in zip(filled, filled_translations):
+                                batch_translations[idx - start] = translation or "TRANSLATION_FAILED"
                             
-                            if translation:
-                                df.at[idx, 'translated_value'] = translation
-                            else:
-                                error_log.append(f"Row {idx + 1}: Translation failed")
-                                df.at[idx, 'translated_value'] = "TRANSLATION_FAILED"
+                            # Write the whole batch, original columns plus its translations, in one call
+                            batch_rows = df.iloc[start:start + len(batch_texts)]
+                            batch_rows.assign(translated_value=batch_translations).to_csv(
+                                output, header=False, index=False, quoting=csv.QUOTE_ALL)
+                            preview_translations.extend(batch_translations[:len(preview) - len(preview_translations)])
                             
-                            progress_bar.progress((idx + 1) / total_rows)
-                        except Exception as e:
-                            error_msg = f"Row {idx + 1}: {str(e)}"
-                            error_log.append(error_msg)
-                            df.at[idx, 'translated_value'] = "ERROR"
-                            continue
-                    
-                    # Create download link for the translated CSV
-                    output = io.StringIO()
-                    df.to_csv(output, index=False, encoding='utf-8-sig', quoting=csv.QUOTE_ALL)
-                    output.seek(0)
+                            done = start + len(batch_texts)
+                            status_text.text(f"Translated {done} of {total_rows} rows...")
+                            progress_bar.progress(done / total_rows)
+                    finally:
+                        # If the script stops early (a widget interaction reruns it), drop the
+                        # queued batches instead of translating rows nobody will download
+                        for _, _, future in queued:
+                            future.cancel()
                     
                     st.success("Translation completed!")
                     
@@ -178,15 +228,21 @@ elif page == "Batch Processing":
                         for error in error_log:
                             st.write(f"- {error}")
                     
+                    csv_data = output.getvalue().encode('utf-8-sig')
                     st.download_button(
                         label="Download Translated CSV",
-                        data=output.getvalue().encode('utf-8-sig'),
+                        data=csv_data,
                         file_name=f"translated_{target_lang.lower()}.csv",
                         mime="text/csv"
                     )
                     
                     st.write("Preview of the translated data:")
-                    st.dataframe(df.head())
+                    st.dataframe(preview.assign(translated_value=preview_translations))
+                    
+                    # Drop the upload and the translation buffers now rather than keeping
+                    # them alive until the next rerun replaces them
+                    del df, texts, output, csv_data
+                    gc.collect()
                     
         except Exception as e:
             st.error(f"Error processing the file: {str(e)}")
@@ -229,7 +285,9 @@ else:  # Evaluation page
             
             # Run evaluation with progress callback
             with st.spinner("Evaluating translations..."):
-                metrics = evaluator.evaluate_dataset('translated_output.csv', progress_callback=update_progress)
+                dataset_path = 'translated_output.csv'
+                dataset = load_evaluation_dataset(dataset_path, os.path.getmtime(dataset_path))
+                metrics = get_evaluator().evaluate_dataset(dataset, progress_callback=update_progress)
             
             # Clear the progress indicators
             progress_bar.empty()
@@ -270,6 +328,11 @@ else:  # Evaluation page
                     f"{metrics['google_bleu']:.3f}",
                     f"±{metrics['google_bleu_std']:.3f}"
                 )
+            
+            st.caption(
+                f"Corpus BLEU (sacrebleu, floor-smoothed, n-grams pooled over all rows): "
+                f"LLM {metrics['llm_corpus_bleu']:.3f}, Google {metrics['google_corpus_bleu']:.3f}"
+            )
                 
         except Exception as e:
             st.error(f"Error evaluating dataset: {str(e)}")
@@ -308,6 +371,8 @@ else:  # Evaluation page
             - Measures exact phrase matches
             - Penalizes both too-short and too-long translations
             - Good at capturing translation fluency
+        - Per-row scores use NLTK's sentence BLEU with method1 smoothing; the corpus BLEU pools
+          n-grams over all rows and uses sacrebleu's floor smoothing
         
         ### Evaluation Process
         1. **Data Preparation**:
@@ -316,7 +381,7 @@ else:  # Evaluation page
            - Column 'label' contains human reference translations
         
         2. **Translation Generation**:
-           - Generate translations using both LLM (GPT-4) and Google Translate
+           - Generate translations using both the LLM (GPT-4o mini, falling back to GPT-4o) and Google Translate
            - Process each text while preserving special placeholders
         
         3. **Metric Calculation**:
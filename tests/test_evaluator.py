@@ -0,0 +1,164 @@
+import os
+import time
+import unittest
+from concurrent.futures import Future, ThreadPoolExecutor
+from unittest import mock
+
+import pandas as pd
+from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
+
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+import evaluator
+from evaluator import _bleu, TranslationEvaluator
+
+
+class SentenceBleuTest(unittest.TestCase):
+    """Per-row BLEU must keep reporting NLTK's sentence_bleu with method1 smoothing."""
+
+    PAIRS = [
+        ("one", "one"),
+        ("one", "two"),
+        ("hello world", "hello world"),
+        ("hello world", "world hello"),
+        ("a b c d e f", "a b c"),
+        ("a b c", "a b d"),
+        ("the cat sat on mat", "the cat sat on mat"),
+        ("the cat sat on the mat", "a cat sat on a mat"),
+        ("short", "a b c d e"),
+    ]
+
+    def test_matches_nltk_method1(self):
+        smoothing = SmoothingFunction().method1
+        for reference, candidate in self.PAIRS:
+            with self.subTest(reference=reference, candidate=candidate):
+                expected = sentence_bleu([reference.split()], candidate.split(), smoothing_function=smoothing)
+                self.assertAlmostEqual(_bleu(tuple(reference.split()), tuple(candidate.split())), expected)
+
+    def test_short_identical_candidates_do_not_score_zero(self):
+        self.assertAlmostEqual(_bleu(("hello", "world"), ("hello", "world")), 0.1 ** 0.5)
+
+    def test_empty_candidate_scores_zero(self):
+        self.assertEqual(_bleu(("hello",), ()), 0.0)
+
+
+@mock.patch.object(evaluator, '_tok', lambda text: tuple(text.lower().split()))
+class CorpusBleuTest(unittest.TestCase):
+    """The NumPy n-gram statistics must agree with sacrebleu's own counting."""
+
+    REFERENCES = ["the cat sat on the mat", "a b c d e f", "hello world", "one", "x y x y x y"]
+    CANDIDATES = ["the cat sat on a mat", "a b c", "hello world", "two", "x y x x y y y"]
+
+    def test_statistics_match_sacrebleu(self):
+        expected = evaluator._BLEU.corpus_score(self.CANDIDATES, [self.REFERENCES])
+        correct, total, sys_len, ref_len = evaluator._bleu_statistics(self.REFERENCES, self.CANDIDATES)
+        self.assertEqual(correct, expected.counts)
+        self.assertEqual(total, expected.totals)
+        self.assertEqual((sys_len, ref_len), (expected.sys_len, expected.ref_len))
+
+    def test_corpus_score_matches_sacrebleu(self):
+        expected = evaluator._BLEU.corpus_score(self.CANDIDATES, [self.REFERENCES]).score / 100
+        scorer = TranslationEvaluator.__new__(TranslationEvaluator)
+        scorer.bleu = evaluator._BLEU
+        self.assertAlmostEqual(scorer.calculate_corpus_bleu_score(self.REFERENCES, self.CANDIDATES), expected)
+
+    def test_corpus_score_is_floor_smoothed(self):
+        scorer = TranslationEvaluator.__new__(TranslationEvaluator)
+        scorer.bleu = evaluator._BLEU
+        # No 2-, 3- or 4-gram matches: each order counts 0.1 matches out of 3, 2 and 1 n-grams
+        expected = (1 * 0.1 / 3 * 0.1 / 2 * 0.1 / 1) ** 0.25
+        self.assertAlmostEqual(scorer.calculate_corpus_bleu_score(["a b c d"], ["a c b d"]), expected)
+        # Without any 4-grams the score is 0, where NLTK's corpus_bleu with method1 gives about 0.077
+        self.assertEqual(scorer.calculate_corpus_bleu_score(["e f f d c"], ["e c f"]), 0.0)
+
+
+class RecordingTranslator:
+    """Stands in for TranslationCache: echoes texts back and records what was sent."""
+
+    def __init__(self):
+        self.sent = []
+
+    def translate_with_llm_batch(self, texts, target_language):
+        self.sent.extend(texts)
+        return list(texts)
+
+    def translate_with_google_batch(self, texts, target_language):
+        self.sent.extend(texts)
+        return list(texts)
+
+
+# Tokenize on whitespace and skip METEOR so the tests need no NLTK data downloads
+@mock.patch.object(evaluator, '_tok', lambda text: tuple(text.lower().split()))
+@mock.patch.object(evaluator, '_meteor', lambda reference, candidate: 1.0)
+class EvaluateDatasetTest(unittest.TestCase):
+    def evaluate(self, english, label):
+        translator = RecordingTranslator()
+        evaluator_ = TranslationEvaluator.__new__(TranslationEvaluator)
+        evaluator_.translator = translator
+        evaluator_.bleu = evaluator._BLEU
+        progress = []
+        df = pd.DataFrame({'english': english, 'label': label}, dtype='string')
+        results = evaluator_.evaluate_dataset(df, progress_callback=lambda done, total, _: progress.append(done))
+        return results, translator.sent, progress
+
+    def test_providers_are_queued_batch_by_batch(self):
+        submitted = []
+
+        class RecordingExecutor:
+            def submit(self, fn, *args):
+                submitted.append(fn.__name__)
+                future = Future()
+                future.set_result(fn(*args))
+                return future
+
+        with mock.patch.object(evaluator, 'TRANSLATION_EXECUTOR', RecordingExecutor()):
+            translator = RecordingTranslator()
+            evaluator_ = TranslationEvaluator.__new__(TranslationEvaluator)
+            evaluator_.translator = translator
+            evaluator_.bleu = evaluator._BLEU
+            df = pd.DataFrame({'english': ['a', 'b', 'c'], 'label': ['a', 'b', 'c']}, dtype='string')
+            evaluator_.evaluate_dataset(df, batch_size=1)
+        self.assertEqual(submitted, ['translate_with_llm_batch', 'translate_with_google_batch'] * 3)
+
+    def test_early_exit_cancels_queued_batches(self):
+        submitted = []
+        pool = ThreadPoolExecutor(max_workers=1)
+
+        class CountingExecutor:
+            def submit(self, fn, *args):
+                submitted.append(fn.__name__)
+                return pool.submit(fn, *args)
+
+        def stop(done, total, metrics):
+            raise KeyboardInterrupt  # Like Streamlit stopping the script mid-run
+
+        class SlowTranslator(RecordingTranslator):
+            def translate_with_llm_batch(self, texts, target_language):
+                time.sleep(0.02)
+                return super().translate_with_llm_batch(texts, target_language)
+
+        translator = SlowTranslator()
+        evaluator_ = TranslationEvaluator.__new__(TranslationEvaluator)
+        evaluator_.translator = translator
+        evaluator_.bleu = evaluator._BLEU
+        texts = [f"text {i}" for i in range(50)]
+        df = pd.DataFrame({'english': texts, 'label': texts}, dtype='string')
+        with mock.patch.object(evaluator, 'TRANSLATION_EXECUTOR', CountingExecutor()):
+            with self.assertRaises(KeyboardInterrupt):
+                evaluator_.evaluate_dataset(df, batch_size=1, progress_callback=stop)
+        pool.shutdown(wait=True)
+
+        # Only a bounded window of batches is queued, and what was still queued never ran
+        self.assertLessEqual(len(submitted), 2 * (evaluator.MAX_QUEUED_BATCHES + 1))
+        self.assertLess(len(translator.sent), len(submitted))
+
+    def test_empty_sources_are_not_sent_or_scored(self):
+        results, sent, progress = self.evaluate(['a b c d', '', None, '  ', 'a b c d'],
+                                                ['a b c d', 'x', 'y', 'z', 'a b c d'])
+        self.assertEqual(sent, ['a b c d', 'a b c d'])  # one distinct text, once per provider
+        self.assertEqual(results['llm_bleu'], 1.0)
+        self.assertEqual(progress[-1], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
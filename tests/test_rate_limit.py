@@ -0,0 +1,66 @@
+import unittest
+from unittest import mock
+
+import rate_limit
+from rate_limit import RateLimiter, TransientError, backoff_delay, retry_with_backoff
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_burst_then_evenly_spaced(self):
+        now = [100.0]
+        with mock.patch.object(rate_limit.time, 'monotonic', lambda: now[0]):
+            limiter = RateLimiter(60, period=60.0, burst=2)  # one call per second after the burst
+            delays = [limiter._reserve() for _ in range(4)]
+            self.assertEqual(delays, [0.0, 0.0, 1.0, 2.0])
+
+            # Tokens refill with time but never beyond the burst size
+            now[0] += 10
+            self.assertEqual(limiter._reserve(), 0.0)
+            self.assertEqual(limiter._tokens, 1.0)
+
+
+class BackoffTest(unittest.TestCase):
+    def test_delay_is_bounded(self):
+        for attempt in range(12):
+            for _ in range(50):
+                delay = backoff_delay(attempt, base=1.0, cap=60.0)
+                self.assertGreaterEqual(delay, 0.0)
+                self.assertLessEqual(delay, min(60.0, 2 ** attempt))
+
+    @mock.patch.object(rate_limit.time, 'sleep', lambda seconds: None)
+    def test_retries_only_listed_errors(self):
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise TransientError("throttled")
+            return "ok"
+
+        self.assertEqual(retry_with_backoff(flaky, retry_on=(TransientError,)), "ok")
+        self.assertEqual(len(calls), 3)
+
+        def broken():
+            calls.append(1)
+            raise ValueError("bug")
+
+        calls.clear()
+        with self.assertRaises(ValueError):
+            retry_with_backoff(broken, retry_on=(TransientError,))
+        self.assertEqual(len(calls), 1)
+
+    @mock.patch.object(rate_limit.time, 'sleep', lambda seconds: None)
+    def test_gives_up_after_max_tries(self):
+        calls = []
+
+        def always_throttled():
+            calls.append(1)
+            raise TransientError("throttled")
+
+        with self.assertRaises(TransientError):
+            retry_with_backoff(always_throttled, retry_on=(TransientError,), max_tries=4)
+        self.assertEqual(len(calls), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+from translation_cache import TranslationCache
+
+
+class FakeTranslator:
+    """Uppercases texts, records every batch it is asked for and fails on 'bad'."""
+
+    google_model = 'google'
+
+    def __init__(self):
+        self.batches = []
+
+    def translate_with_google_batch(self, texts, target_language):
+        self.batches.append(list(texts))
+        return [None if text == 'bad' else text.upper() for text in texts]
+
+
+class CachedBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.translator = FakeTranslator()
+        self.cache = TranslationCache(self.translator, os.path.join(self.directory.name, 'cache.sqlite'))
+
+    def tearDown(self):
+        self.cache._conn.close()
+        self.directory.cleanup()
+
+    def test_duplicates_are_sent_once_and_scattered_back(self):
+        results = self.cache.translate_with_google_batch(['a', 'b', 'a', 'c', 'b'], 'French')
+        self.assertEqual(results, ['A', 'B', 'A', 'C', 'B'])
+        self.assertEqual(self.translator.batches, [['a', 'b', 'c']])
+
+    def test_stored_translations_are_not_requested_again(self):
+        self.cache.translate_with_google_batch(['a', 'b'], 'French')
+        results = self.cache.translate_with_google_batch(['b', 'c', 'a'], 'French')
+        self.assertEqual(results, ['B', 'C', 'A'])
+        self.assertEqual(self.translator.batches, [['a', 'b'], ['c']])
+
+    def test_failures_are_returned_but_not_stored(self):
+        self.assertEqual(self.cache.translate_with_google_batch(['bad', 'a', 'bad'], 'French'), [None, 'A', None])
+        self.cache.translate_with_google_batch(['bad'], 'French')
+        self.assertEqual(self.translator.batches, [['bad', 'a'], ['bad']])
+
+    def test_languages_are_cached_separately(self):
+        self.cache.translate_with_google_batch(['a'], 'French')
+        self.cache.translate_with_google_batch(['a'], 'German')
+        self.assertEqual(self.translator.batches, [['a'], ['a']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+import os
+import unittest
+from types import SimpleNamespace
+
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+from translator import TranslationService, LLM_FALLBACK_MODEL, LLM_MODEL, LLM_SEGMENT_MARKER
+
+
+def completion(content: str, finish_reason: str = "stop") -> SimpleNamespace:
+    """Shape a string like an OpenAI chat-completions response."""
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content),
+                                                    finish_reason=finish_reason)])
+
+
+class FakeCompletions:
+    """Returns canned responses in turn, repeating the last one, and records the requests made."""
+
+    def __init__(self, *responses):
+        self.responses = [completion(r) if isinstance(r, str) else r for r in responses]
+        self.requests = []
+
+    def create(self, **request):
+        self.requests.append(request)
+        return self.responses[min(len(self.requests), len(self.responses)) - 1]
+
+
+def segments(*texts: str, indices=None) -> str:
+    indices = range(len(texts)) if indices is None else indices
+    return "\n".join(f"{LLM_SEGMENT_MARKER.format(i)}\n{text}" for i, text in zip(indices, texts))
+
+
+class LlmBatchSplitTest(unittest.TestCase):
+    def setUp(self):
+        self.service = TranslationService()
+        self.service._openai_limiter.wait = lambda: None
+        self.fallbacks = []
+        self.service.translate_with_llm = lambda text, language: self.fallbacks.append(text) or f"single:{text}"
+
+    def translate(self, texts, content):
+        self.service.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(content)))
+        return self.service._translate_llm_group(texts, 'French')
+
+    def test_segments_in_order(self):
+        self.assertEqual(self.translate(['a', 'b', 'c'], segments('A', 'B', 'C')), ['A', 'B', 'C'])
+        self.assertEqual(self.fallbacks, [])
+
+    def test_reordered_segments_are_matched_by_number(self):
+        content = segments('C', 'A', 'B', indices=[2, 0, 1])
+        self.assertEqual(self.translate(['a', 'b', 'c'], content), ['A', 'B', 'C'])
+        self.assertEqual(self.fallbacks, [])
+
+    def test_missing_and_repeated_numbers_fall_back_per_text(self):
+        # Same segment count as the input, but 1 is missing and 0 appears twice
+        content = segments('A', 'A2', 'C', indices=[0, 0, 2])
+        self.assertEqual(self.translate(['a', 'b', 'c'], content), ['single:a', 'single:b', 'C'])
+        self.assertEqual(self.fallbacks, ['a', 'b'])
+
+    def test_text_before_first_marker_is_ignored(self):
+        content = "Here are the translations:\n" + segments('A', 'B')
+        self.assertEqual(self.translate(['a', 'b'], content), ['A', 'B'])
+
+    def test_segment_that_lost_brackets_falls_back(self):
+        self.assertEqual(self.translate(['a [name]', 'b'], segments('A', 'B')), ['single:a [name]', 'B'])
+
+    def test_truncated_response_falls_back_for_every_text(self):
+        content = completion(segments('A', 'B'), finish_reason="length")
+        self.assertEqual(self.translate(['a', 'b'], content), ['single:a', 'single:b'])
+        self.assertEqual(self.fallbacks, ['a', 'b'])
+
+    def test_request_failure_falls_back_for_every_text(self):
+        self.service.openai_client = None
+        self.assertEqual(self.service._translate_llm_group(['a', 'b'], 'French'), ['single:a', 'single:b'])
+
+
+class TranslateManyTest(unittest.TestCase):
+    def setUp(self):
+        self.service = TranslationService()
+        self.sent = []
+        self.service.translate_with_llm_batch = lambda texts, language: self.sent.extend(texts) or [t.upper() for t in texts]
+
+    def test_repeated_texts_are_sent_once(self):
+        self.assertEqual(self.service.translate_many(['a', 'b', 'a'], 'French'), ['A', 'B', 'A'])
+        self.assertEqual(self.sent, ['a', 'b'])
+
+    def test_unknown_method_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.service.translate_many(['a'], 'French', method='gpt')
+
+
+class LlmTruncationTest(unittest.TestCase):
+    def setUp(self):
+        self.service = TranslationService()
+        self.service._openai_limiter.wait = lambda: None
+
+    def translate(self, *responses):
+        self.completions = FakeCompletions(*responses)
+        self.service.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=self.completions))
+        return self.service.translate_with_llm('a long text', 'French')
+
+    def test_truncated_translation_is_retried_with_fallback_and_larger_budget(self):
+        result = self.translate(completion('cut', finish_reason="length"), 'whole')
+        self.assertEqual(result, 'whole')
+        first, retry = self.completions.requests
+        self.assertEqual((first['model'], retry['model']), (LLM_MODEL, LLM_FALLBACK_MODEL))
+        self.assertGreater(retry['max_tokens'], first['max_tokens'])
+        self.assertEqual(self.service._cache_get('a long text', 'French', LLM_MODEL), 'whole')
+
+    def test_translation_truncated_twice_fails_and_is_not_cached(self):
+        self.assertIsNone(self.translate(completion('cut', finish_reason="length")))
+        self.assertEqual(len(self.completions.requests), 2)
+        self.assertIsNone(self.service._cache_get('a long text', 'French', LLM_MODEL))
+
+
+class FakeGoogleTranslator:
+    """Stands in for googletrans.Translator, uppercasing text and recording each request."""
+
+    def __init__(self, keep_lines=True, fail=False):
+        self.keep_lines = keep_lines
+        self.fail = fail
+        self.requests = []
+
+    def translate(self, text, dest):
+        self.requests.append(text)
+        if self.fail and '\n' in text:
+            raise RuntimeError("request failed")
+        # googletrans joins sentence parts with spaces; without line breaks in the parts, lines merge
+        translated = text.upper() if self.keep_lines else ' '.join(text.upper().split('\n'))
+        return SimpleNamespace(text=translated)
+
+
+class GoogleBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.service = TranslationService()
+        self.service._google_limiter.wait = lambda: None
+
+    def translate(self, google, texts):
+        self.service.google_translator = google
+        return self.service.translate_with_google_batch(texts, 'French')
+
+    def test_joined_request_when_line_breaks_survive(self):
+        google = FakeGoogleTranslator()
+        self.assertEqual(self.translate(google, ['a [name]', 'b', 'c']), ['A [name]', 'B', 'C'])
+        self.assertEqual(google.requests, ['a Z9PH000Z9\nb\nc'])
+
+    def test_lost_line_breaks_fall_back_once_then_stop_joining(self):
+        google = FakeGoogleTranslator(keep_lines=False)
+        self.assertEqual(self.translate(google, ['a', 'b']), ['A', 'B'])
+        self.assertEqual(google.requests, ['a\nb', 'a', 'b'])
+        
+        google.requests.clear()
+        self.assertEqual(self.translate(google, ['c', 'd']), ['C', 'D'])
+        self.assertEqual(google.requests, ['c', 'd'])
+
+    def test_failed_request_falls_back_per_text_and_keeps_cached_lines(self):
+        self.translate(FakeGoogleTranslator(), ['a', 'b'])
+        google = FakeGoogleTranslator(fail=True)
+        self.assertEqual(self.translate(google, ['a', 'c', 'd']), ['A', 'C', 'D'])
+        self.assertEqual(google.requests, ['c\nd', 'c', 'd'])
+
+
+class PlaceholderRestoreTest(unittest.TestCase):
+    def setUp(self):
+        self.service = TranslationService()
+
+    def test_restore_tolerates_mangled_markers(self):
+        placeholders = ('[a]', '[param name]')
+        self.assertEqual(self.service._restore_placeholders("Hi z9ph000z9 and Z9 PH 001 Z9!", placeholders),
+                         "Hi [a] and [param name]!")
+
+    def test_restore_drops_unknown_markers_without_double_spaces(self):
+        placeholders = ('[a]',)
+        self.assertEqual(self.service._restore_placeholders("x ❮❮PHX❯❯ y Z9PH007Z9 z", placeholders), "x y z")
+        self.assertEqual(self.service._restore_placeholders("a ❮❮PHX❯❯ ❮❮PHX❯❯ b", placeholders), "a b")
+
+    def test_restore_collapses_whitespace(self):
+        self.assertEqual(self.service._restore_placeholders("  a\n\n b\tZ9PH000Z9  ", ('[a]',)), "a b [a]")
+
+
+class PlaceholderPreserveTest(unittest.TestCase):
+    def setUp(self):
+        self.service = TranslationService()
+
+    def test_known_and_keyword_placeholders_become_markers(self):
+        text, placeholders = self.service._preserve_placeholders("Join [brokerName] in [year], [Popularity] [x]")
+        self.assertEqual(text, "Join Z9PH000Z9 in Z9PH001Z9, [Popularity] [x]")
+        self.assertEqual(placeholders, ('[brokerName]', '[year]'))
+
+    def test_text_without_brackets_is_unchanged(self):
+        self.assertEqual(self.service._preserve_placeholders("No placeholders here"), ("No placeholders here", ()))
+
+    def test_round_trip(self):
+        source = "Compare [firstBrokerName] and [secondBrokerName] for [param name]"
+        text, placeholders = self.service._preserve_placeholders(source)
+        self.assertEqual(self.service._restore_placeholders(text, placeholders), source)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import hashlib
+import sqlite3
+import threading
+from typing import Callable, Dict, List, Optional
+from translator import TranslationService, LLM_MODEL
+
+
+class TranslationCache:
+    """
+    Persistent cache in front of a TranslationService.
+
+    Translations are deterministic enough per (text, language, model) that re-running an
+    evaluation should not pay for them again, so results are stored in a SQLite table keyed
+    by a hash of those three values. Failed translations (None) are never cached.
+    """
+
+    def __init__(self, translator: TranslationService, db_path: str = 'translations.sqlite'):
+        self.translator = translator
+        # The connection is shared by the evaluation thread pool, so serialize access to it
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS translations (
+                       hash TEXT PRIMARY KEY,
+                       model TEXT,
+                       lang TEXT,
+                       src TEXT,
+                       tgt TEXT
+                   )"""
+            )
+
+    @staticmethod
+    def _key(text: str, target_language: str, model: str) -> str:
+        """Hash the cache key; blake2b is faster than sha256 and 16 bytes is plenty here."""
+        return hashlib.blake2b(f"{model}|{target_language}|{text}".encode('utf-8'),
+                               digest_size=16).hexdigest()
+
+    def _cached(self, translate: Callable[[str, str], Optional[str]], model: str,
+                text: str, target_language: str) -> Optional[str]:
+        """Return the stored translation, or translate and store it on a miss."""
+        key = self._key(text, target_language, model)
+        with self._lock:
+            row = self._conn.execute("SELECT tgt FROM translations WHERE hash = ?", (key,)).fetchone()
+        if row:
+            return row[0]
+        
+        translation = translate(text, target_language)
+        if translation:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO translations (hash, model, lang, src, tgt) VALUES (?, ?, ?, ?, ?)",
+                    (key, model, target_language, text, translation)
+                )
+        return translation
+
+    def _cached_batch(self, translate_batch: Callable[[List[str], str], List[Optional[str]]], model: str,
+                      texts: List[str], target_language: str) -> List[Optional[str]]:
+        """Return stored translations for a batch, translating only the misses in one batch call."""
+        keys = [self._key(text, target_language, model) for text in texts]
+        with self._lock:
+            stored = {}
+            for key in set(keys):
+                row = self._conn.execute("SELECT tgt FROM translations WHERE hash = ?", (key,)).fetchone()
+                if row:
+                    stored[key] = row[0]
+        
+        # Only the first occurrence of each missing text is sent to the provider
+        first_index = {}
+        for i, key in enumerate(keys):
+            first_index.setdefault(key, i)
+        missing = [i for key, i in first_index.items() if key not in stored]
+        if missing:
+            translations = translate_batch([texts[i] for i in missing], target_language)
+            new_rows = [(keys[i], model, target_language, texts[i], translation)
+                        for i, translation in zip(missing, translations) if translation]
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO translations (hash, model, lang, src, tgt) VALUES (?, ?, ?, ?, ?)",
+                    new_rows
+                )
+            for i, translation in zip(missing, translations):
+                stored.setdefault(keys[i], translation)
+        
+        return [stored[key] for key in keys]
+
+    def translate_with_llm(self, text: str, target_language: str) -> Optional[str]:
+        """Translate text using OpenAI's LLM, reusing any stored translation."""
+        return self._cached(self.translator.translate_with_llm, LLM_MODEL, text, target_language)
+
+    def translate_with_google(self, text: str, target_language: str) -> Optional[str]:
+        """Translate text using Google Translate, reusing any stored translation."""
+        return self._cached(self.translator.translate_with_google, self.translator.google_model,
+                            text, target_language)
+
+    def translate_with_llm_batch(self, texts: List[str], target_language: str) -> List[Optional[str]]:
+        """Translate several texts with OpenAI's LLM, reusing any stored translations."""
+        return self._cached_batch(self.translator.translate_with_llm_batch, LLM_MODEL, texts, target_language)
+
+    def translate_with_llm_offline(self, texts: List[str], target_language: str) -> List[Optional[str]]:
+        """Translate texts through the OpenAI Batch API, submitting only those not already stored."""
+        return self._cached_batch(self.translator.translate_with_llm_offline, LLM_MODEL, texts, target_language)
+
+    def translate_with_llm_concurrent(self, texts: List[str], target_language: str) -> List[Optional[str]]:
+        """Translate texts with concurrent OpenAI requests, sending only those not already stored."""
+        return self._cached_batch(self.translator.translate_with_llm_concurrent, LLM_MODEL, texts, target_language)
+
+    def translate_with_google_batch(self, texts: List[str], target_language: str) -> List[Optional[str]]:
+        """Translate several texts with Google Translate, reusing any stored translations."""
+        return self._cached_batch(self.translator.translate_with_google_batch, self.translator.google_model,
+                                  texts, target_language)
+
+    def get_supported_languages(self) -> Dict[str, str]:
+        """Return the list of supported languages and their codes."""
+        return self.translator.get_supported_languages()